@@ -0,0 +1,297 @@
+import os
+import re
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+BAND_PATTERN = re.compile(r'_(\d+)_(\d+)$')
+
+
+def band_from_name(name: str) -> Optional[float]:
+    """
+    Parse the human band score from a testset folder name, e.g. "-awN8jpvDFo_7_0" -> 7.0.
+    """
+    match = BAND_PATTERN.search(name)
+    if not match:
+        return None
+    return float(f"{match.group(1)}.{match.group(2)}")
+
+
+def openai_embedder(model: str = "text-embedding-3-small") -> Callable[[List[str]], np.ndarray]:
+    """
+    Default embedder backed by OpenAI embeddings (same client evaluate.py uses).
+    """
+    from langchain_openai import OpenAIEmbeddings
+
+    embeddings = OpenAIEmbeddings(model=model, api_key=os.getenv("OPENAI_API_KEY"))
+
+    def embed(texts: List[str]) -> np.ndarray:
+        return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+    return embed
+
+
+class FeedbackIndex:
+    """
+    Nearest-neighbour index over human examiner feedback transcripts.
+
+    Vectors are L2-normalised and kept in a flat NumPy matrix, so a flat query is
+    a single matrix-vector product. For large corpora an approximate backend
+    ("ivf" via faiss, "hnsw" via hnswlib) can be layered on top of the matrix.
+    """
+
+    BACKENDS = ("flat", "ivf", "hnsw")
+
+    def __init__(self, embedder: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 backend: str = "flat", feedback_file: str = "human_feedback.txt"):
+        """
+        Initialise an empty index. `embedder` maps a list of texts to an (n, d) array.
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
+
+        self.embedder = embedder or openai_embedder()
+        self.backend = backend
+        self.feedback_file = feedback_file
+
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.bands: List[Optional[float]] = []
+        self.mtimes: List[float] = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+
+        self._ann = None
+
+    # -------------------------------
+    # Building
+    # -------------------------------
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(self.embedder(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def update(self, testset_dir: str = "./testset") -> List[str]:
+        """
+        Incrementally sync the index with `testset_dir`.
+        Only new folders, or folders whose feedback file changed, are embedded.
+        Returns the ids that were (re-)embedded.
+        """
+        positions = {name: i for i, name in enumerate(self.ids)}
+        pending: List[Tuple[str, str, float]] = []
+
+        for subdir in sorted(Path(testset_dir).iterdir()):
+            feedback_path = subdir / self.feedback_file
+            if not subdir.is_dir() or not feedback_path.is_file():
+                continue
+
+            mtime = feedback_path.stat().st_mtime
+            i = positions.get(subdir.name)
+            if i is not None and self.mtimes[i] == mtime:
+                continue
+
+            with open(feedback_path, 'r', encoding='utf-8') as f:
+                pending.append((subdir.name, f.read().strip(), mtime))
+
+        if not pending:
+            return []
+
+        new_vectors = self._embed([text for _, text, _ in pending])
+        if self.vectors.size == 0:
+            self.vectors = np.zeros((0, new_vectors.shape[1]), dtype=np.float32)
+
+        appended = []
+        for (name, text, mtime), vector in zip(pending, new_vectors):
+            i = positions.get(name)
+            if i is None:
+                self.ids.append(name)
+                self.texts.append(text)
+                self.bands.append(band_from_name(name))
+                self.mtimes.append(mtime)
+                appended.append(vector)
+            else:
+                self.texts[i] = text
+                self.mtimes[i] = mtime
+                self.vectors[i] = vector
+
+        replaced = len(appended) < len(pending)
+        if appended:
+            self.vectors = np.vstack([self.vectors, np.stack(appended)])
+
+        self._sync_ann(appended_count=len(appended), full_rebuild=replaced)
+        return [name for name, _, _ in pending]
+
+    def _sync_ann(self, appended_count: int, full_rebuild: bool):
+        """
+        Keep the approximate backend in step with the flat matrix.
+        HNSW supports in-place appends; IVF and replaced rows need a rebuild.
+        """
+        if self.backend == "flat":
+            return
+
+        n, dim = self.vectors.shape
+        if self.backend == "hnsw":
+            import hnswlib
+
+            if self._ann is None or full_rebuild:
+                self._ann = hnswlib.Index(space="ip", dim=dim)
+                self._ann.init_index(max_elements=max(n, 16), ef_construction=200, M=16)
+                self._ann.add_items(self.vectors, np.arange(n))
+            elif appended_count:
+                if n > self._ann.get_max_elements():
+                    self._ann.resize_index(max(n, 2 * self._ann.get_max_elements()))
+                self._ann.add_items(self.vectors[n - appended_count:], np.arange(n - appended_count, n))
+            self._ann.set_ef(64)
+        else:
+            import faiss
+
+            nlist = max(1, int(np.sqrt(n)))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(self.vectors)
+            index.add(self.vectors)
+            index.nprobe = min(nlist, 8)
+            self._ann = index
+
+    # -------------------------------
+    # Querying
+    # -------------------------------
+    def _search(self, query_vectors: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, indices) of shape (q, k) for a batch of normalised query vectors.
+        """
+        k = min(k, len(self.ids))
+        if self._ann is not None and self.backend == "hnsw":
+            labels, distances = self._ann.knn_query(query_vectors, k=k)
+            return 1.0 - distances, labels.astype(np.int64)
+        if self._ann is not None and self.backend == "ivf":
+            scores, labels = self._ann.search(query_vectors, k)
+            return scores, labels
+
+        scores = query_vectors @ self.vectors.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def query(self, text: str, k: int = 5, band: Optional[float] = None,
+              exclude: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Return the k transcripts most similar to `text`, optionally restricted to one band.
+        Ids in `exclude` (e.g. the recording being evaluated) are never returned.
+        """
+        excluded = set(exclude or ())
+        if not self.ids:
+            return []
+
+        query_vector = self._embed([text])
+        if band is None:
+            scores, indices = self._search(query_vector, k + len(excluded))
+            pairs = zip(indices[0], scores[0])
+        else:
+            candidates = self._candidates(band, excluded)
+            if candidates.size == 0:
+                return []
+            scores = self.vectors[candidates] @ query_vector[0]
+            order = np.argsort(-scores)
+            pairs = zip(candidates[order], scores[order])
+
+        records = [self._record(i, score) for i, score in pairs if i >= 0 and self.ids[i] not in excluded]
+        return records[:k]
+
+    def by_band(self, band: float, k: int = 3, exclude: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Return up to k exemplars for `band`, most central (closest to the band mean) first.
+        Ids in `exclude` (e.g. the recording being evaluated) are never returned.
+        """
+        candidates = self._candidates(band, set(exclude or ()))
+        if candidates.size == 0:
+            return []
+
+        centroid = self.vectors[candidates].mean(axis=0)
+        scores = self.vectors[candidates] @ centroid
+        order = np.argsort(-scores)[:k]
+        return [self._record(i, score) for i, score in zip(candidates[order], scores[order])]
+
+    def _candidates(self, band: float, excluded: set) -> np.ndarray:
+        return np.array(
+            [i for i, (name, b) in enumerate(zip(self.ids, self.bands)) if b == band and name not in excluded],
+            dtype=np.int64,
+        )
+
+    def near_duplicates(self, threshold: float = 0.95, k: int = 10,
+                        batch_size: int = 1024) -> List[Tuple[str, str, float]]:
+        """
+        Find pairs of transcripts with cosine similarity >= threshold among each item's k nearest neighbours.
+        With the "ivf"/"hnsw" backends each item is only compared against its neighbours; the "flat"
+        backend is still O(n^2) time, but rows are scored in batches so memory stays O(batch_size * n).
+        """
+        if len(self.ids) < 2:
+            return []
+
+        pairs: Dict[Tuple[int, int], float] = {}
+        for start in range(0, len(self.ids), batch_size):
+            scores, indices = self._search(self.vectors[start:start + batch_size], k + 1)
+            for offset, (row_indices, row_scores) in enumerate(zip(indices, scores)):
+                i = start + offset
+                for j, score in zip(row_indices, row_scores):
+                    j = int(j)
+                    if j < 0 or j == i or score < threshold:
+                        continue
+                    # Neighbour lists are not symmetric, so keep the pair whichever side found it.
+                    key = (min(i, j), max(i, j))
+                    pairs[key] = max(pairs.get(key, -1.0), float(score))
+
+        return sorted(
+            ((self.ids[i], self.ids[j], score) for (i, j), score in pairs.items()),
+            key=lambda pair: -pair[2],
+        )
+
+    def _record(self, i: int, score: float) -> Dict:
+        return {
+            "id": self.ids[i],
+            "band": self.bands[i],
+            "score": float(score),
+            "text": self.texts[i],
+        }
+
+    # -------------------------------
+    # Persistence
+    # -------------------------------
+    def save(self, path: str = "results/feedback_index"):
+        """
+        Save vectors to `<path>.npz` and metadata to `<path>.json`.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(f"{path}.npz", vectors=self.vectors)
+        with open(f"{path}.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                "feedback_file": self.feedback_file,
+                "ids": self.ids,
+                "texts": self.texts,
+                "bands": self.bands,
+                "mtimes": self.mtimes,
+            }, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str = "results/feedback_index",
+             embedder: Optional[Callable[[List[str]], np.ndarray]] = None,
+             backend: str = "flat") -> "FeedbackIndex":
+        """
+        Load an index written by `save`. Call `update` afterwards to pick up new folders.
+        """
+        with open(f"{path}.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        index = cls(embedder=embedder, backend=backend, feedback_file=meta["feedback_file"])
+        index.ids = meta["ids"]
+        index.texts = meta["texts"]
+        index.bands = meta["bands"]
+        index.mtimes = meta["mtimes"]
+        index.vectors = np.load(f"{path}.npz")["vectors"]
+        if index.ids:
+            index._sync_ann(appended_count=0, full_rebuild=True)
+        return index
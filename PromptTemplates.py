@@ -0,0 +1,439 @@
+import re
+from typing import Dict, List, Optional, Union
+
+
+AUDIO_FORMAT_PATTERN = re.compile(r'\.([a-zA-Z0-9]+)(?:[?#].*)?$')
+
+
+def audio_format(audio_url: str) -> str:
+    """
+    Return the audio file extension of `audio_url` (e.g. "mp3"), ignoring any query string.
+    """
+    match = AUDIO_FORMAT_PATTERN.search(audio_url)
+    if not match:
+        raise ValueError(f"Cannot determine audio format from URL: {audio_url}")
+    return match.group(1).lower()
+
+
+_ENCODER = None
+_TOKENIZER = None
+
+
+def _load_encoder():
+    """
+    Load the tokenizer on first use rather than at import: tiktoken downloads its BPE file
+    the first time an encoding is requested. Token counts are diagnostic only, so any
+    failure (missing package, offline, HTTP error) falls back to chars/4 for the session.
+    """
+    global _ENCODER, _TOKENIZER
+    if _TOKENIZER is None:
+        try:
+            import tiktoken
+            _ENCODER = tiktoken.get_encoding("cl100k_base")
+            _TOKENIZER = "tiktoken/cl100k_base"
+        except Exception:
+            _ENCODER = None
+            _TOKENIZER = "chars/4"
+    return _ENCODER
+
+
+def tokenizer_name() -> str:
+    """
+    Name of the tokenizer behind count_tokens ("tiktoken/cl100k_base" or "chars/4").
+    """
+    _load_encoder()
+    return _TOKENIZER
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count prompt tokens with tiktoken (cl100k_base) as a proxy for the Qwen tokenizer.
+    Falls back to ~4 characters per token when tiktoken is unavailable.
+    """
+    encoder = _load_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return (len(text) + 3) // 4
+
+
+def format_exemplars(exemplars: Optional[List[Union[Dict, str]]]) -> str:
+    """
+    Render reference examiner feedback for the user turn. Exemplars are FeedbackIndex
+    records (with "text" and "band") or plain strings; the band is shown when known.
+    """
+    if not exemplars:
+        return ""
+
+    text = "\n\nFor calibration, here is human examiner feedback on other candidates:\n"
+    for i, exemplar in enumerate(exemplars, 1):
+        if isinstance(exemplar, dict):
+            band = exemplar.get("band")
+            header = f"Reference {i} (band {band:.1f})" if band is not None else f"Reference {i}"
+            body = exemplar["text"]
+        else:
+            header, body = f"Reference {i}", exemplar
+        text += f"\n--- {header} ---\n{body}\n"
+    return text
+
+
+class PromptTemplate:
+    """
+    A versioned, precompiled prompt: the system message (if any) is built once and the
+    token count of the static text is computed once, on first use.
+    """
+
+    def __init__(self, name: str, version: str, system: Optional[str], user: str):
+        self.name = name
+        self.version = version
+        self.system = system.strip() if system else ""
+        self.user = user.strip()
+        self.system_message = {"role": "system", "content": self.system} if self.system else None
+        self._tokens = None
+
+    @property
+    def tokens(self) -> int:
+        """
+        Token count of the static system and user text (see `tokenizer`).
+        """
+        if self._tokens is None:
+            self._tokens = (count_tokens(self.system) if self.system else 0) + count_tokens(self.user)
+        return self._tokens
+
+    @property
+    def tokenizer(self) -> str:
+        return tokenizer_name()
+
+    def prompt_tokens(self, exemplars: Optional[List[Union[Dict, str]]] = None) -> int:
+        """
+        Token count of the prompt actually sent, including any appended exemplars.
+        """
+        return self.tokens + (count_tokens(format_exemplars(exemplars)) if exemplars else 0)
+
+    def build_messages(self, audio_url: str, exemplars: Optional[List[Union[Dict, str]]] = None) -> list:
+        """
+        Construct the chat messages for `audio_url`. Only the user turn is built per call.
+        """
+        user_prompt = self.user + format_exemplars(exemplars)
+
+        messages = [self.system_message] if self.system_message else []
+        return messages + [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "input_audio",
+                        "input_audio": {
+                            "data": audio_url,
+                            "format": audio_format(audio_url),
+                        },
+                    },
+                    {
+                        "type": "text",
+                        "text": user_prompt,
+                    },
+                ],
+            },
+        ]
+
+
+# -------------------------------
+# Full rubric. FULL_USER_PROMPT on its own is the original
+# user-turn-only prompt behind testset/*/model_feedback.txt and results/
+# -------------------------------
+FULL_SYSTEM_PROMPT = """
+You are an IELTS Speaking examiner with extensive experience assessing candidates according to the official IELTS Speaking Band Descriptors published by the British Council, IDP, and Cambridge English. You are very strict and meticulous in your evaluations, focusing closely on fluency and coherence, lexical resource, grammatical range and accuracy, and pronunciation. You are not lenient and do not give generous scores without clear evidence of performance; your assessments are precise, objective, and strictly aligned with the official band descriptors.
+
+You will receive an audio recording that contains BOTH examiner questions and candidate responses.
+
+Your task is:
+
+1. **Identify and evaluate ONLY the candidate's speech.**  
+   - Ignore the examiner entirely.  
+   - Do not quote, analyze, or reference examiner speech.  
+   - If examiner and candidate overlap, extract only the candidate's words.  
+
+2. **Score the candidate strictly according to the official IELTS Speaking criteria**:
+   - Fluency and Coherence  
+   - Lexical Resource  
+   - Grammatical Range and Accuracy  
+   - Pronunciation  
+
+3. **Assign band scores from 0-9** following the public IELTS descriptors.  
+   - Compute the overall band score by averaging the four categories and rounding to the nearest half band  
+     (6.25 → 6.5, 6.75 → 7.0).
+
+4. **Provide structured written feedback**, with examples quoted ONLY from the candidate's speech.
+
+----------------------------------------------------------
+OFFICIAL IELTS SPEAKING BAND DESCRIPTORS (FULL RUBRIC)
+----------------------------------------------------------
+
+The following is the complete set of official IELTS Speaking Band Descriptors.  
+You must follow these EXACTLY when assigning scores and writing feedback.
+
+================ BAND 9 =================
+Fluency & Coherence:
+- Fluent with only very occasional repetition or self-correction.
+- Any hesitation is for content, not for searching language.
+- Coherent, with appropriate cohesive features.
+- Topic development is fully coherent and extended.
+
+Lexical Resource:
+- Total flexibility and precise vocabulary use in all contexts.
+- Sustained, accurate idiomatic language.
+
+Grammatical Range & Accuracy:
+- Structures are precise and accurate at all times except for native-like slips.
+
+Pronunciation:
+- Full range of phonological features.
+- Flexible, sustained connected speech.
+- Effortlessly understood; accent does not affect intelligibility.
+
+================ BAND 8 =================
+Fluency & Coherence:
+- Fluent with very occasional self-correction.
+- Hesitation mostly content-related.
+- Topic development is coherent and relevant.
+
+Lexical Resource:
+- Wide vocabulary, used flexibly with precise meaning.
+- Skillful use of less common and idiomatic items.
+- Effective paraphrasing.
+
+Grammatical Range & Accuracy:
+- Wide range of structures used flexibly.
+- Majority of sentences are error-free; occasional non-systematic errors.
+
+Pronunciation:
+- Wide range of features used accurately.
+- Sustains rhythm, stress, intonation with few lapses.
+- Easily understood; accent minimal impact.
+
+================ BAND 7 =================
+Fluency & Coherence:
+- Can speak at length without much effort.
+- Some hesitation, repetition, self-correction, but coherence maintained.
+- Flexible use of discourse markers and cohesive devices.
+
+Lexical Resource:
+- Uses vocabulary flexibly on varied topics.
+- Some ability with less common and idiomatic items.
+- Effective paraphrasing.
+
+Grammatical Range & Accuracy:
+- Range of structures used flexibly.
+- Frequent error-free sentences.
+- Some errors in both simple and complex forms; a few basic errors persist.
+
+Pronunciation:
+- All positive features of Band 6 + some of Band 8.
+- Generally clear with effective use of stress, rhythm, intonation.
+
+================ BAND 6 =================
+Fluency & Coherence:
+- Willing to produce long turns.
+- Occasional loss of coherence from hesitation, repetition.
+- Uses discourse markers but sometimes inappropriately.
+
+Lexical Resource:
+- Sufficient range for extended discussion.
+- Some inappropriate word choice but meaning clear.
+- Can generally paraphrase effectively.
+
+Grammatical Range & Accuracy:
+- Mix of short and complex forms; limited flexibility.
+- Errors common in complex structures but rarely impede meaning.
+
+Pronunciation:
+- Uses phonological features with variable control.
+- Generally appropriate chunking but rhythm may be irregular.
+- Occasional unclear pronunciation but intelligible overall.
+
+================ BAND 5 =================
+Fluency & Coherence:
+- Usually keeps going but depends on repetition/self-correction or slow speech.
+- Hesitation for basic words/grammar.
+- Overuses discourse markers.
+
+Lexical Resource:
+- Enough vocabulary for familiar/unfamiliar topics but limited flexibility.
+- Attempts paraphrase with mixed success.
+
+Grammatical Range & Accuracy:
+- Basic forms fairly well controlled.
+- Complex structures attempted but error-prone and limited.
+
+Pronunciation:
+- Some positive features of Band 4 and Band 6.
+- Pronunciation issues sometimes require effort to understand.
+
+================ BAND 4 =================
+Fluency & Coherence:
+- Cannot keep going without pausing.
+- Slow speech, frequent repetition.
+- Basic linking but with repetitious connectives.
+
+Lexical Resource:
+- Limited vocabulary; can express basic meaning for familiar topics.
+- Frequent errors; rarely paraphrases.
+
+Grammatical Range & Accuracy:
+- Basic sentence forms only.
+- Turns short; repetitive structures; frequent errors.
+
+Pronunciation:
+- Limited phonological range.
+- Frequent lapses in rhythm.
+- Many mispronunciations causing lack of clarity.
+
+================ BAND 3 =================
+Fluency & Coherence:
+- Frequent long pauses.
+- Limited ability to link ideas.
+
+Lexical Resource:
+- Very limited vocabulary; primarily personal info.
+- Inadequate for unfamiliar topics.
+
+Grammatical Range & Accuracy:
+- Basic forms attempted but with numerous errors unless memorised.
+
+Pronunciation:
+- Some Band 2 features, some Band 4 features.
+
+================ BAND 2 =================
+Very limited speech, mostly isolated words or memorised chunks.
+Unintelligible for long stretches.
+
+================ BAND 1 =================
+No communication possible except isolated words; speech incoherent.
+
+================ BAND 0 =================
+Does not attend.
+
+----------------------------------------------------------
+EVALUATION OUTPUT FORMAT (FOLLOW EXACTLY)
+----------------------------------------------------------
+
+1. **Overall Band Score**: X.X  
+   One-sentence justification (holistic).
+
+2. **Individual Band Scores**:
+   - Fluency and Coherence: X.X
+   - Lexical Resource: X.X
+   - Grammatical Range and Accuracy: X.X
+   - Pronunciation: X.X
+
+3. **Feedback Paragraphs (Candidate Only)**  
+For each criterion:
+- 3-5 sentences.
+- Include 2-3 specific examples **from the candidate's speech only**.
+- Explicitly link observations to the IELTS descriptors.
+- End with 1-2 targeted, practical improvement suggestions.
+
+----------------------------------------------------------
+FINAL RULES
+----------------------------------------------------------
+
+- REFRAIN FROM evaluating or referencing the examiner.
+- REFRAIN FROM using examiner speech as evidence.
+- ONLY evaluate what the candidate says.
+- Maintain strict consistency with the official IELTS rubric above.
+- REFRAIN FROM BEING TOO GENEROUS WITH BAND SCORES.
+- MUST FOLLOW THE RUBRIC EXACTLY.
+- MUST BE STRICT AND NON-GENEROUS IN SCORING.
+"""
+
+FULL_USER_PROMPT = """
+The purpose of this evaluation is to assess the IELTS Speaking performance of the test taker based on the official band descriptors. Remember, the goal is a fair, descriptor-based scoring focused solely on the test taker's contributions to provide actionable feedback for improvement.
+
+The provided audio is a conversation between the IELTS examiner and the test taker during the speaking test. Please focus exclusively on the test taker's speech for the evaluation—ignore the examiner's contributions entirely and only analyze the candidate's responses, fluency, vocabulary, grammar, and pronunciation. Refrain from referencing or scoring the examiner's speech in any way.
+
+----------------------------------------------------------
+FINAL RULES
+----------------------------------------------------------
+
+- REFRAIN FROM evaluating or referencing the examiner.
+- REFRAIN FROM using examiner speech as evidence.
+- ONLY evaluate what the candidate says.
+- Maintain strict consistency with the official IELTS rubric above.
+- REFRAIN FROM BEING TOO GENEROUS WITH BAND SCORES.
+"""
+
+# -------------------------------
+# Compact rubric
+# -------------------------------
+COMPACT_SYSTEM_PROMPT = """
+You are a strict IELTS Speaking examiner. The audio contains BOTH examiner questions and candidate responses: evaluate ONLY the candidate and never quote or score the examiner.
+
+Score the candidate 0-9 on each official criterion: Fluency and Coherence (FC), Lexical Resource (LR), Grammatical Range and Accuracy (GRA), Pronunciation (P). The overall band is the average of the four, rounded to the nearest half band (6.25 → 6.5, 6.75 → 7.0). Do not be generous without clear evidence.
+
+RUBRIC (condensed official descriptors)
+- 9: FC fully coherent, hesitation only for content. LR precise, idiomatic in all contexts. GRA accurate at all times. P effortless, full range of features.
+- 8: FC fluent, rare self-correction. LR wide, skilful less common/idiomatic items. GRA mostly error-free, wide range. P easily understood, few lapses.
+- 7: FC speaks at length, some hesitation, flexible cohesive devices. LR flexible, some idiomatic items. GRA frequent error-free sentences, some errors. P clear stress, rhythm, intonation.
+- 6: FC long turns, occasional loss of coherence, markers sometimes inappropriate. LR sufficient range, paraphrases. GRA mix of forms, errors in complex structures. P variable control, intelligible.
+- 5: FC relies on repetition/slow speech, overuses markers. LR limited flexibility. GRA basic forms controlled, complex forms error-prone. P sometimes needs effort to understand.
+- 4: FC cannot keep going without pauses. LR basic, frequent errors. GRA basic forms, frequent errors. P frequent mispronunciation.
+- 3: long pauses, very limited vocabulary, numerous errors. 2: isolated words. 1: no communication. 0: does not attend.
+
+OUTPUT FORMAT (FOLLOW EXACTLY)
+1. **Overall Band Score**: X.X
+   One-sentence justification.
+2. **Individual Band Scores**:
+   - Fluency and Coherence: X.X
+   - Lexical Resource: X.X
+   - Grammatical Range and Accuracy: X.X
+   - Pronunciation: X.X
+3. **Feedback Paragraphs (Candidate Only)**
+   For each criterion: 3-5 sentences with 2-3 quoted candidate examples and 1-2 practical improvement suggestions.
+"""
+
+COMPACT_USER_PROMPT = """
+Evaluate the candidate's IELTS Speaking performance in this recording. Ignore the examiner entirely and follow the rubric and output format exactly.
+"""
+
+# -------------------------------
+# Scores only
+# -------------------------------
+SCORES_ONLY_SYSTEM_PROMPT = """
+You are a strict IELTS Speaking examiner. The audio contains BOTH examiner questions and candidate responses: score ONLY the candidate against the official IELTS Speaking band descriptors. Do not be generous without clear evidence.
+
+Output exactly the following and nothing else:
+1. **Overall Band Score**: X.X
+2. **Individual Band Scores**:
+   - Fluency and Coherence: X.X
+   - Lexical Resource: X.X
+   - Grammatical Range and Accuracy: X.X
+   - Pronunciation: X.X
+
+The overall band is the average of the four criteria, rounded to the nearest half band.
+"""
+
+SCORES_ONLY_USER_PROMPT = """
+Score the candidate's IELTS Speaking performance in this recording.
+"""
+
+
+TEMPLATES: Dict[str, PromptTemplate] = {
+    template.name: template
+    for template in (
+        PromptTemplate("user-only", "user-only-v1", None, FULL_USER_PROMPT),
+        PromptTemplate("full", "full-v1", FULL_SYSTEM_PROMPT, FULL_USER_PROMPT),
+        PromptTemplate("compact", "compact-v1", COMPACT_SYSTEM_PROMPT, COMPACT_USER_PROMPT),
+        PromptTemplate("scores-only", "scores-only-v1", SCORES_ONLY_SYSTEM_PROMPT, SCORES_ONLY_USER_PROMPT),
+    )
+}
+
+# The legacy prompt stays the default until the benchmark shows another one keeps accuracy.
+DEFAULT_TEMPLATE = "user-only"
+
+
+def get_template(name: str = DEFAULT_TEMPLATE) -> PromptTemplate:
+    """
+    Look up a prompt template by name.
+    """
+    if name not in TEMPLATES:
+        raise ValueError(f"Unknown prompt template '{name}', expected one of {list(TEMPLATES)}")
+    return TEMPLATES[name]
@@ -0,0 +1,139 @@
+# --------------------------------------------------------------
+# benchmark_prompts.py – Compare prompt templates on the testset
+# (prompt tokens, latency and score agreement)
+# --------------------------------------------------------------
+
+import os
+import re
+import csv
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from FeedbackIndex import band_from_name
+from PromptTemplates import DEFAULT_TEMPLATE, TEMPLATES
+
+SCORE_PATTERN = re.compile(r'Overall Band Score\*\*: (\d+(\.\d+)?)')
+BASE_URL = "https://github.com/hk414/automatic-feedback-for-ielts-speaking-asr/raw/refs/heads/main/testset"
+
+
+def overall_band(text: str):
+    """
+    Extract the overall band score from model output (same pattern as scoring.ipynb).
+    """
+    match = SCORE_PATTERN.search(text)
+    return float(match.group(1)) if match else None
+
+
+def run(testset_dir: str, templates: list, limit: int, model: str) -> list:
+    # Imported here so summarise() can be used without the API client installed
+    from dotenv import load_dotenv
+    from QwenIELTSEvaluator import QwenIELTSEvaluator
+
+    load_dotenv()
+    api_key = os.getenv("DASHSCOPE_API_KEY")
+    evaluators = {name: QwenIELTSEvaluator(api_key=api_key, template=name) for name in templates}
+
+    rows = []
+    folders = [
+        d for d in sorted(Path(testset_dir).iterdir())
+        if d.is_dir() and band_from_name(d.name) is not None and (d / f"{d.name}_part_2.mp3").exists()
+    ]
+    for subdir in folders[:limit]:
+        audio_url = f"{BASE_URL}/{subdir.name}/{subdir.name}_part_2.mp3"
+        for name, evaluator in evaluators.items():
+            record = evaluator.evaluate_record(audio_url, model=model)
+            usage = record["usage"] or {}
+            rows.append({
+                "folder": subdir.name,
+                "template_version": record["template_version"],
+                "prompt_tokens": record["prompt_tokens"],
+                "tokenizer": record["tokenizer"],
+                "api_prompt_tokens": usage.get("prompt_tokens") if isinstance(usage, dict) else None,
+                "latency": record["latency"],
+                "model_band": overall_band(record["text"]),
+                "human_band": band_from_name(subdir.name),
+                "error": record.get("error"),
+            })
+    return rows
+
+
+def summarise(rows: list, reference: str = DEFAULT_TEMPLATE) -> list:
+    """
+    Per template: static and API-reported prompt tokens, mean latency of successful
+    calls, MAD/RMSE against the human band, and the share of folders whose band
+    matches the reference template's band. Failed calls are counted, not averaged.
+    """
+    reference_bands = {
+        r["folder"]: r["model_band"] for r in rows
+        if r["template_version"] == TEMPLATES[reference].version and r["model_band"] is not None
+    } if reference in TEMPLATES else {}
+
+    summary = []
+    for template in TEMPLATES.values():
+        subset = [r for r in rows if r["template_version"] == template.version]
+        if not subset:
+            continue
+        succeeded = [r for r in subset if not r["error"]]
+        api_tokens = [r["api_prompt_tokens"] for r in succeeded if r["api_prompt_tokens"] is not None]
+        scored = [r for r in succeeded if r["model_band"] is not None]
+        diffs = np.array([r["human_band"] - r["model_band"] for r in scored])
+        matched = [r for r in scored if r["folder"] in reference_bands]
+        agreement = (
+            np.mean([r["model_band"] == reference_bands[r["folder"]] for r in matched]) if matched else None
+        )
+        summary.append({
+            "template_version": template.version,
+            "prompt_tokens": template.tokens,
+            "tokenizer": template.tokenizer,
+            "mean_api_prompt_tokens": float(np.mean(api_tokens)) if api_tokens else None,
+            "mean_latency": float(np.mean([r["latency"] for r in succeeded])) if succeeded else None,
+            "errors": len(subset) - len(succeeded),
+            "scored": f"{len(scored)}/{len(subset)}",
+            "mad": float(np.mean(np.abs(diffs))) if len(diffs) else None,
+            "rmse": float(np.sqrt(np.mean(diffs ** 2))) if len(diffs) else None,
+            f"agreement_with_{reference}": float(agreement) if agreement is not None else None,
+        })
+    return summary
+
+
+def write_csv(rows: list, path: str):
+    if not rows:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Saved: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IELTS prompt templates.")
+    parser.add_argument("--testset", default="./testset")
+    parser.add_argument("--templates", nargs="+", default=list(TEMPLATES), choices=list(TEMPLATES))
+    parser.add_argument("--limit", type=int, default=10, help="Number of testset folders to evaluate")
+    parser.add_argument("--model", default="qwen3-omni-flash")
+    parser.add_argument("--tokens-only", action="store_true", help="Only print precomputed prompt token counts")
+    args = parser.parse_args()
+
+    print("\n=== Prompt Templates ===")
+    for template in TEMPLATES.values():
+        print(f"{template.version:20}: {template.tokens} tokens ({template.tokenizer})")
+    if args.tokens_only:
+        return
+
+    rows = run(args.testset, args.templates, args.limit, args.model)
+    write_csv(rows, "results/prompt_benchmark.csv")
+
+    summary = summarise(rows)
+    write_csv(summary, "results/prompt_benchmark_summary.csv")
+
+    print("\n=== Summary ===")
+    for entry in summary:
+        print(", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in entry.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import pytest
+
+from benchmark_prompts import summarise
+
+
+def row(folder, version, model_band, human_band, latency, error=None, api_prompt_tokens=None):
+    return {
+        "folder": folder,
+        "template_version": version,
+        "prompt_tokens": 0,
+        "tokenizer": "chars/4",
+        "api_prompt_tokens": api_prompt_tokens,
+        "latency": latency,
+        "model_band": model_band,
+        "human_band": human_band,
+        "error": error,
+    }
+
+
+def test_summarise_excludes_failed_rows_and_measures_agreement():
+    rows = [
+        row("a_7_0", "user-only-v1", 7.0, 7.0, 4.0, api_prompt_tokens=300),
+        row("b_6_0", "user-only-v1", 6.5, 6.0, 6.0, api_prompt_tokens=500),
+        row("a_7_0", "compact-v1", 7.0, 7.0, 2.0, api_prompt_tokens=700),
+        row("b_6_0", "compact-v1", 5.5, 6.0, 3.0, api_prompt_tokens=900),
+        row("c_5_0", "compact-v1", None, 5.0, 0.1, error="timeout"),
+    ]
+
+    summary = {entry["template_version"]: entry for entry in summarise(rows, reference="user-only")}
+
+    compact = summary["compact-v1"]
+    assert compact["errors"] == 1
+    assert compact["scored"] == "2/3"
+    assert compact["mean_latency"] == pytest.approx(2.5)
+    assert compact["mean_api_prompt_tokens"] == pytest.approx(800)
+    assert compact["mad"] == pytest.approx(0.25)
+    assert compact["rmse"] == pytest.approx(0.5 / 2 ** 0.5)
+    assert compact["agreement_with_user-only"] == pytest.approx(0.5)
+
+    baseline = summary["user-only-v1"]
+    assert baseline["errors"] == 0
+    assert baseline["mean_latency"] == pytest.approx(5.0)
+    assert baseline["agreement_with_user-only"] == pytest.approx(1.0)
+    assert "full-v1" not in summary
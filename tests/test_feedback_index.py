@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+
+from FeedbackIndex import FeedbackIndex
+
+
+def angle_embedder(angles):
+    """
+    Deterministic embedder: each text is the name of a 2-D unit vector at a known angle (degrees).
+    """
+    def embed(texts):
+        return np.array([[np.cos(np.radians(angles[t])), np.sin(np.radians(angles[t]))] for t in texts])
+    return embed
+
+
+def build_index(tmp_path, angles):
+    for name in angles:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "human_feedback.txt").write_text(name, encoding="utf-8")
+    index = FeedbackIndex(embedder=angle_embedder(angles))
+    index.update(str(tmp_path))
+    return index
+
+
+def test_near_duplicates_keeps_asymmetric_neighbour_pairs(tmp_path):
+    # "b*" form a dense cluster, so b1's nearest neighbour is b2, not z;
+    # z (sorted last) only finds b1 from its own side.
+    angles = {"b1_7_0": 10.0, "b2_7_0": 10.5, "b3_7_0": 11.0, "z_7_0": 0.0}
+    index = build_index(tmp_path, angles)
+
+    pairs = index.near_duplicates(threshold=0.95, k=1)
+    found = {(a, b) for a, b, _ in pairs}
+
+    assert ("b1_7_0", "z_7_0") in found
+    assert len(found) == len(pairs)
+
+
+def test_exclude_removes_own_feedback(tmp_path):
+    angles = {"a_7_0": 0.0, "b_7_0": 5.0, "c_6_0": 90.0}
+    index = build_index(tmp_path, angles)
+
+    assert [r["id"] for r in index.by_band(7.0, exclude=["a_7_0"])] == ["b_7_0"]
+    assert [r["id"] for r in index.query("a_7_0", k=1, exclude=["a_7_0"])] == ["b_7_0"]
+    assert [r["id"] for r in index.query("a_7_0", k=2, band=7.0, exclude=["a_7_0"])] == ["b_7_0"]
+
+
+def test_update_embeds_only_new_folders(tmp_path):
+    angles = {"a_7_0": 0.0, "b_6_0": 45.0, "c_5_0": 90.0}
+    index = build_index(tmp_path, {"a_7_0": 0.0, "b_6_0": 45.0})
+    index.embedder = angle_embedder(angles)
+
+    assert index.update(str(tmp_path)) == []
+
+    (tmp_path / "c_5_0").mkdir()
+    (tmp_path / "c_5_0" / "human_feedback.txt").write_text("c_5_0", encoding="utf-8")
+
+    assert index.update(str(tmp_path)) == ["c_5_0"]
+    assert index.ids == ["a_7_0", "b_6_0", "c_5_0"]
+    assert index.vectors.shape == (3, 2)
+
+
+def test_update_replaces_changed_row(tmp_path):
+    angles = {"a_7_0": 0.0, "b_6_0": 45.0, "rewritten": 90.0}
+    index = build_index(tmp_path, {"a_7_0": 0.0, "b_6_0": 45.0})
+    index.embedder = angle_embedder(angles)
+
+    feedback_path = tmp_path / "a_7_0" / "human_feedback.txt"
+    feedback_path.write_text("rewritten", encoding="utf-8")
+    mtime = index.mtimes[0] + 10
+    os.utime(feedback_path, (mtime, mtime))
+
+    assert index.update(str(tmp_path)) == ["a_7_0"]
+    assert index.ids == ["a_7_0", "b_6_0"]
+    assert index.vectors.shape == (2, 2)
+    assert index.texts[0] == "rewritten"
+    np.testing.assert_allclose(index.vectors[0], [0.0, 1.0], atol=1e-6)
+
+
+def test_save_load_round_trip_is_up_to_date(tmp_path):
+    angles = {"a_7_0": 0.0, "b_6_0": 45.0}
+    testset = tmp_path / "testset"
+    testset.mkdir()
+    index = build_index(testset, angles)
+
+    path = str(tmp_path / "index" / "feedback_index")
+    index.save(path)
+    loaded = FeedbackIndex.load(path, embedder=angle_embedder(angles))
+
+    assert loaded.ids == index.ids
+    assert loaded.bands == [7.0, 6.0]
+    np.testing.assert_allclose(loaded.vectors, index.vectors)
+    assert loaded.update(str(testset)) == []
@@ -0,0 +1,57 @@
+import sys
+import types
+
+import pytest
+
+import PromptTemplates
+from PromptTemplates import TEMPLATES, audio_format, get_template
+
+
+def test_audio_format():
+    assert audio_format("https://x/y_part_1.mp3") == "mp3"
+    assert audio_format("https://github.com/a/b/raw/main/y.WAV?raw=true") == "wav"
+
+
+def test_audio_format_missing_extension_raises():
+    with pytest.raises(ValueError):
+        audio_format("https://x/recording")
+
+
+def test_system_prompt_is_sent_first():
+    messages = get_template("full").build_messages("https://x/y.mp3")
+
+    assert messages[0] == {"role": "system", "content": TEMPLATES["full"].system}
+    assert messages[1]["role"] == "user"
+    assert messages[1]["content"][0]["input_audio"]["format"] == "mp3"
+
+
+def test_user_only_template_has_no_system_message():
+    messages = get_template("user-only").build_messages("https://x/y.mp3")
+
+    assert [m["role"] for m in messages] == ["user"]
+
+
+def test_prompt_tokens_include_exemplars():
+    template = get_template("compact")
+    exemplars = [{"text": "Good range of vocabulary. " * 20, "band": 7.0}, "Short answers."]
+
+    assert template.prompt_tokens() == template.tokens
+    assert template.prompt_tokens(exemplars) > template.tokens
+    assert "(band 7.0)" in template.build_messages("https://x/y.mp3", exemplars)[-1]["content"][1]["text"]
+
+
+def test_tokenizer_download_failure_falls_back(monkeypatch):
+    calls = []
+
+    def get_encoding(name):
+        calls.append(name)
+        raise ConnectionError("offline")
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=get_encoding))
+    monkeypatch.setattr(PromptTemplates, "_ENCODER", None)
+    monkeypatch.setattr(PromptTemplates, "_TOKENIZER", None)
+
+    assert PromptTemplates.count_tokens("abcdefgh") == 2
+    assert PromptTemplates.count_tokens("abcd") == 1
+    assert PromptTemplates.tokenizer_name() == "chars/4"
+    assert len(calls) == 1